@@ -11,15 +11,17 @@ To set up:
 7. First run will open a browser for authentication
 """
 
+import json
 import os
-from datetime import datetime, timedelta
-from typing import Any
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# The Google client libraries are imported where they are used, so importing
+# this module (and starting main.py) stays cheap
+if TYPE_CHECKING:
+    import httplib2
+    from google.oauth2.credentials import Credentials
 
 # If modifying scopes, delete token.json
 SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
@@ -27,15 +29,67 @@ SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CREDENTIALS_FILE = os.path.join(SCRIPT_DIR, "credentials.json")
 TOKEN_FILE = os.path.join(SCRIPT_DIR, "token.json")
+EVENTS_CACHE_FILE = os.path.join(SCRIPT_DIR, "events_cache.json")
+
+# The client library appends "(gzip)" and sends accept-encoding: gzip, so
+# responses are compressed; identify the app in front of that marker
+USER_AGENT = "claude-personal-assistant/0.1.0"
+
+# Upper bound on events fetched per calendar; small enough that a single
+# pure-Python pass over the items is cheap
+MAX_RESULTS = 50
+
+# Only request the event fields we actually use (partial response)
+EVENT_FIELDS = "etag,items(summary,start,end,location,description,hangoutLink)"
+
+# UTC timestamp format for the timeMin/timeMax query bounds
+RFC3339_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Display formats for event start times in the agent prompt
+DATETIME_FORMAT = "%a %b %d, %I:%M %p"
+ALL_DAY_FORMAT = "%a %b %d (all day)"
+
+# Authenticated service and its credentials, reused while the token is valid
+_SERVICE: "tuple[Any, Credentials] | None" = None
+# Shared HTTP transport so the connection to googleapis.com stays alive between calls
+_HTTP: "httplib2.Http | None" = None
+
+
+@dataclass(slots=True)
+class Event:
+    """A calendar event as returned to callers."""
+
+    summary: str
+    start: str
+    end: str
+    location: str
+    description: str
+    hangout_link: str
 
 
 def get_calendar_service():
-    """Get authenticated Google Calendar service."""
-    creds = None
+    """Get authenticated Google Calendar service, reusing it while the token is valid."""
+    global _SERVICE, _HTTP
+
+    if _SERVICE is not None and _SERVICE[1].valid:
+        return _SERVICE[0]
 
-    # Load existing token
-    if os.path.exists(TOKEN_FILE):
+    import httplib2
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_httplib2 import AuthorizedHttp
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    from googleapiclient.http import set_user_agent
+
+    # Reuse in-memory credentials; only read token.json on first use
+    if _SERVICE is not None:
+        creds = _SERVICE[1]
+    elif os.path.exists(TOKEN_FILE):
         creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+    else:
+        creds = None
+    old_token = creds.token if creds else None
 
     # If no valid credentials, authenticate
     if not creds or not creds.valid:
@@ -51,58 +105,154 @@ def get_calendar_service():
             flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
             creds = flow.run_local_server(port=0)
 
-        # Save credentials for next run
+    # Save credentials for next run, only if the access token was rotated
+    if creds.token != old_token:
         with open(TOKEN_FILE, "w") as token:
             token.write(creds.to_json())
 
-    return build("calendar", "v3", credentials=creds)
+    if _HTTP is None:
+        _HTTP = httplib2.Http()
+
+    # static_discovery=True is already the library default (no discoveryServiceUrl);
+    # pinned explicitly so the bundled discovery document stays in use
+    service = build(
+        "calendar",
+        "v3",
+        http=set_user_agent(AuthorizedHttp(creds, http=_HTTP), USER_AGENT),
+        cache_discovery=False,
+        static_discovery=True,
+    )
+    _SERVICE = (service, creds)
+    return service
+
+
+def _load_events_cache(time_min: str, time_max: str) -> dict[str, Any] | None:
+    """Load the last fetched event items and their ETag, if cached for the same window."""
+    if not os.path.exists(EVENTS_CACHE_FILE):
+        return None
 
+    try:
+        with open(EVENTS_CACHE_FILE) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(cache, dict):
+        return None
+    if (
+        cache.get("window") != [time_min, time_max]
+        or not cache.get("etag")
+        or "items" not in cache
+    ):
+        return None
+    return cache
+
+
+def _save_events_cache(
+    time_min: str, time_max: str, etag: str | None, items: list[dict[str, Any]]
+) -> None:
+    """Save fetched event items and their ETag for conditional requests on the next run."""
+    with open(EVENTS_CACHE_FILE, "w") as f:
+        json.dump(
+            {"window": [time_min, time_max], "etag": etag, "items": items},
+            f,
+            separators=(",", ":"),
+        )
 
-def get_upcoming_events(days: int = 5) -> list[dict[str, Any]]:
+
+def _time_window(now: datetime, days: int) -> tuple[str, str]:
     """
-    Fetch calendar events for the next N days.
+    Return the RFC 3339 timeMin/timeMax bounds covering the next N days from now.
 
-    Returns a list of events with: summary, start, end, location, description
+    The bounds are widened to whole hours, so repeated fetches within the hour
+    send the same query and can be revalidated with the cached ETag. Events that
+    already ended before now must be dropped with _drop_ended_items.
     """
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    time_min = hour.strftime(RFC3339_FORMAT)
+    time_max = (hour + timedelta(days=days, hours=1)).strftime(RFC3339_FORMAT)
+    return time_min, time_max
+
+
+def _drop_ended_items(items: list[dict[str, Any]], now: datetime) -> list[dict[str, Any]]:
+    """Drop event items that ended at or before now (timeMin is rounded down)."""
+    today = now.astimezone().date()
+
+    def has_ended(item: dict[str, Any]) -> bool:
+        end = _event_time(item["end"])
+        if "T" in end:
+            return datetime.fromisoformat(end) <= now
+        # All-day events end (exclusively) on a local date
+        return date.fromisoformat(end) <= today
+
+    return [item for item in items if not has_ended(item)]
+
+
+def _event_time(when: dict[str, Any]) -> str:
+    """Return an event start/end as a dateTime, or a date for all-day events."""
+    return when.get("dateTime", when.get("date"))
+
+
+def _no_events_message(days: int) -> str:
+    """Return the prompt text used when there are no events to list."""
+    return f"No calendar events found for the next {days} days (or calendar not configured)."
+
+
+def _to_event(item: dict[str, Any]) -> Event:
+    """Convert a raw API event item to an Event."""
+    start = _event_time(item["start"])
+    end = _event_time(item["end"])
+
+    return Event(
+        summary=item.get("summary", "No title"),
+        start=start,
+        end=end,
+        location=item.get("location", ""),
+        description=item.get("description", ""),
+        hangout_link=item.get("hangoutLink", ""),
+    )
+
+
+def _fetch_event_items(days: int) -> list[dict[str, Any]]:
+    """Fetch raw event items from the primary calendar for the next N days."""
+    from googleapiclient.errors import HttpError
+
     try:
         service = get_calendar_service()
 
-        now = datetime.utcnow()
-        time_min = now.isoformat() + "Z"
-        time_max = (now + timedelta(days=days)).isoformat() + "Z"
+        now = datetime.now(timezone.utc)
+        time_min, time_max = _time_window(now, days)
 
         # Get events from primary calendar
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=time_min,
-                timeMax=time_max,
-                maxResults=50,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
+        request = service.events().list(
+            calendarId="primary",
+            timeMin=time_min,
+            timeMax=time_max,
+            maxResults=MAX_RESULTS,
+            singleEvents=True,
+            orderBy="startTime",
+            fields=EVENT_FIELDS,
         )
 
-        events = events_result.get("items", [])
+        # Ask the server to skip the body if nothing changed since the last fetch
+        cache = _load_events_cache(time_min, time_max)
+        if cache:
+            request.headers["If-None-Match"] = cache["etag"]
 
-        # Format events for the agent
-        formatted_events = []
-        for event in events:
-            start = event["start"].get("dateTime", event["start"].get("date"))
-            end = event["end"].get("dateTime", event["end"].get("date"))
+        try:
+            events_result = request.execute()
+        except HttpError as error:
+            if cache and error.resp.status == 304:
+                return _drop_ended_items(cache["items"], now)
+            raise
 
-            formatted_events.append({
-                "summary": event.get("summary", "No title"),
-                "start": start,
-                "end": end,
-                "location": event.get("location", ""),
-                "description": event.get("description", ""),
-                "hangout_link": event.get("hangoutLink", ""),
-            })
-
-        return formatted_events
+        items = events_result.get("items", [])
+        # A failed cache write only costs the next conditional request
+        try:
+            _save_events_cache(time_min, time_max, events_result.get("etag"), items)
+        except OSError as e:
+            print(f"Could not write events cache: {e}")
+        return _drop_ended_items(items, now)
 
     except HttpError as error:
         print(f"Google Calendar API error: {error}")
@@ -115,30 +265,113 @@ def get_upcoming_events(days: int = 5) -> list[dict[str, Any]]:
         return []
 
 
-def format_events_for_prompt(events: list[dict[str, Any]]) -> str:
+def get_upcoming_events(days: int = 5) -> list[Event]:
+    """
+    Fetch calendar events for the next N days.
+
+    Returns a list of Events with: summary, start, end, location, description, hangout_link
+    """
+    return [_to_event(item) for item in _fetch_event_items(days)]
+
+
+def get_upcoming_events_for_calendars(
+    cal_ids: list[str], days: int = 5
+) -> dict[str, list[Event]]:
+    """
+    Fetch events for the next N days from several calendars in one batch request.
+
+    Returns a mapping of calendar ID to events in the same shape as
+    get_upcoming_events. Calendars that fail to load map to an empty list.
+    """
+    from googleapiclient.errors import HttpError
+
+    results: dict[str, list[Event]] = {cal_id: [] for cal_id in cal_ids}
+
+    def handle_response(
+        request_id: str, response: dict[str, Any], exception: Exception | None
+    ) -> None:
+        if exception is not None:
+            print(f"Google Calendar API error for {request_id}: {exception}")
+            return
+        items = _drop_ended_items(response.get("items", []), now)
+        results[request_id] = [_to_event(item) for item in items]
+
+    try:
+        service = get_calendar_service()
+        now = datetime.now(timezone.utc)
+        time_min, time_max = _time_window(now, days)
+
+        # One HTTP round-trip for all calendars instead of one per calendar
+        batch = service.new_batch_http_request(callback=handle_response)
+        for cal_id in results:
+            batch.add(
+                service.events().list(
+                    calendarId=cal_id,
+                    timeMin=time_min,
+                    timeMax=time_max,
+                    maxResults=MAX_RESULTS,
+                    singleEvents=True,
+                    orderBy="startTime",
+                    fields=EVENT_FIELDS,
+                ),
+                request_id=cal_id,
+            )
+        batch.execute()
+
+    except HttpError as error:
+        print(f"Google Calendar API error: {error}")
+    except FileNotFoundError as e:
+        print(f"Calendar setup required: {e}")
+    except Exception as e:
+        print(f"Error fetching calendar events: {e}")
+
+    return results
+
+
+def get_upcoming_events_formatted(days: int = 5) -> tuple[str, int]:
+    """
+    Fetch calendar events for the next N days, formatted for the agent prompt.
+
+    Formats straight from the API items in one pass, without building the
+    intermediate Events of get_upcoming_events.
+
+    Returns the prompt text and the number of events it lists.
+    """
+    items = _fetch_event_items(days)
+    if not items:
+        return _no_events_message(days), 0
+
+    text = "\n".join([
+        _format_event_line(
+            event.get("summary", "No title"),
+            _event_time(event["start"]),
+            event.get("location", ""),
+        )
+        for event in items
+    ])
+    return text, len(items)
+
+
+def _format_event_line(summary: str, start: str, location: str) -> str:
+    """Format a single event as a prompt bullet line."""
+    # DateTime vs date only (all-day event); fromisoformat accepts a trailing "Z"
+    date_format = DATETIME_FORMAT if "T" in start else ALL_DAY_FORMAT
+    date_str = datetime.fromisoformat(start).strftime(date_format)
+
+    if location:
+        return f"- {date_str}: {summary} @ {location}"
+    return f"- {date_str}: {summary}"
+
+
+def format_events_for_prompt(events: list[Event]) -> str:
     """Format events as a string for the agent prompt."""
     if not events:
-        return "No calendar events found for the next 5 days (or calendar not configured)."
-
-    lines = []
-    for event in events:
-        start = event["start"]
-        # Parse and format the date/time
-        if "T" in start:
-            # DateTime format
-            dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
-            date_str = dt.strftime("%a %b %d, %I:%M %p")
-        else:
-            # Date only (all-day event)
-            dt = datetime.fromisoformat(start)
-            date_str = dt.strftime("%a %b %d") + " (all day)"
-
-        line = f"- {date_str}: {event['summary']}"
-        if event["location"]:
-            line += f" @ {event['location']}"
-        lines.append(line)
+        return _no_events_message(5)
 
-    return "\n".join(lines)
+    return "\n".join([
+        _format_event_line(event.summary, event.start, event.location)
+        for event in events
+    ])
 
 
 if __name__ == "__main__":
@@ -7,30 +7,139 @@ ClaudePersonalAssistant - A personal assistant agent that:
 """
 
 import asyncio
+import atexit
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
-from typing import Any
+import sys
+import threading
+from calendar import month_name
+from datetime import date, datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 from dotenv import load_dotenv
 
-from calendar_integration import get_upcoming_events, format_events_for_prompt
-from claude_agent_sdk import (
-    ClaudeSDKClient,
-    ClaudeAgentOptions,
-    tool,
-    create_sdk_mcp_server,
-    AssistantMessage,
-    TextBlock,
-    ResultMessage,
-)
+from calendar_integration import get_upcoming_events_formatted
+
+# claude_agent_sdk, smtplib and email.mime are imported where they are used,
+# so the missing-environment exit path in main() starts quickly
+if TYPE_CHECKING:
+    import smtplib
+    from email.mime.text import MIMEText
+
+    from claude_agent_sdk import ClaudeAgentOptions, McpSdkServerConfig
 
 load_dotenv()
 
 
-@tool(
+class SMTPConfig(NamedTuple):
+    """SMTP settings read once from the environment."""
+
+    host: str
+    port: int
+    user: str
+    password: str
+    from_email: str
+
+
+class SMTPConfigError(ValueError):
+    """Raised when the SMTP environment variables are missing or invalid."""
+
+
+@lru_cache(maxsize=1)
+def get_smtp_config() -> SMTPConfig:
+    """Read and validate SMTP settings from environment variables, once per process."""
+    errors = []
+
+    smtp_host = os.getenv("SMTP_HOST", "")
+    if not smtp_host:
+        errors.append(
+            "SMTP_HOST is required. Set it to 'localhost' for Mailpit or 'smtp.gmail.com' for Gmail."
+        )
+
+    # A blank SMTP_PORT falls back to the default
+    port_value = os.getenv("SMTP_PORT") or "1025"
+    smtp_port = int(port_value) if port_value.isdigit() else 0
+    if not 1 <= smtp_port <= 65535:
+        errors.append(f"SMTP_PORT must be a port number from 1 to 65535, got: {port_value!r}")
+
+    if errors:
+        raise SMTPConfigError("\n".join(errors))
+
+    smtp_user = os.getenv("SMTP_USER", "")
+    return SMTPConfig(
+        host=smtp_host,
+        port=smtp_port,
+        user=smtp_user,
+        password=os.getenv("SMTP_PASSWORD", ""),
+        from_email=os.getenv("FROM_EMAIL") or smtp_user or "assistant@localhost",
+    )
+
+
+# Agent text is buffered and written to stdout once it reaches this many characters
+OUTPUT_FLUSH_CHARS = 4096
+
+# Live SMTP connection, reused across send_email calls
+_smtp: "smtplib.SMTP | None" = None
+# Serializes use of the shared connection between worker threads
+_smtp_lock = threading.Lock()
+
+
+def _get_smtp() -> "smtplib.SMTP":
+    """Return the shared SMTP connection, connecting and logging in on first use."""
+    global _smtp
+
+    if _smtp is None:
+        import smtplib
+
+        config = get_smtp_config()
+        server = smtplib.SMTP(config.host, config.port)
+        try:
+            # Only use TLS and auth if credentials are provided (not needed for local Mailpit)
+            if config.user and config.password:
+                server.starttls()
+                server.login(config.user, config.password)
+        except Exception:
+            server.close()
+            raise
+        _smtp = server
+
+    return _smtp
+
+
+def _close_smtp() -> None:
+    """Close the shared SMTP connection, if one is open."""
+    global _smtp
+
+    if _smtp is None:
+        return
+
+    import smtplib
+
+    try:
+        _smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        _smtp.close()
+    _smtp = None
+
+
+atexit.register(_close_smtp)
+
+
+def _send_message(msg: "MIMEText") -> None:
+    """Send a message over the shared SMTP connection (blocking)."""
+    import smtplib
+
+    with _smtp_lock:
+        try:
+            _get_smtp().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped the idle connection; reconnect once and retry
+            _close_smtp()
+            _get_smtp().send_message(msg)
+
+
+# Name, description and input schema for registering send_email as an SDK tool
+SEND_EMAIL_TOOL = (
     "send_email",
     "Send an email via SMTP. Use this to send reminder emails with formatted content.",
     {
@@ -39,44 +148,25 @@ load_dotenv()
         "body_html": str,
     },
 )
-async def send_email(args: dict[str, Any]) -> dict[str, Any]:
-    """Send an email using SMTP configuration from environment variables."""
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "1025"))
-    smtp_user = os.getenv("SMTP_USER", "")
-    smtp_password = os.getenv("SMTP_PASSWORD", "")
-    from_email = os.getenv("FROM_EMAIL") or smtp_user or "assistant@localhost"
 
-    if not smtp_host:
-        return {
-            "content": [
-                {
-                    "type": "text",
-                    "text": "Error: SMTP_HOST is required. Set it to 'localhost' for Mailpit or 'smtp.gmail.com' for Gmail.",
-                }
-            ],
-            "is_error": True,
-        }
+
+async def send_email(args: dict[str, Any]) -> dict[str, Any]:
+    """Send an email using the SMTP configuration loaded at startup."""
+    from email.mime.text import MIMEText
 
     to_email = args["to"]
     subject = args["subject"]
     body_html = args["body_html"]
 
     try:
-        msg = MIMEMultipart("alternative")
+        # Single HTML part, so no multipart/alternative container is needed
+        msg = MIMEText(body_html, "html", "utf-8")
         msg["Subject"] = subject
-        msg["From"] = from_email
+        msg["From"] = get_smtp_config().from_email
         msg["To"] = to_email
 
-        html_part = MIMEText(body_html, "html")
-        msg.attach(html_part)
-
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            # Only use TLS and auth if credentials are provided (not needed for local Mailpit)
-            if smtp_user and smtp_password:
-                server.starttls()
-                server.login(smtp_user, smtp_password)
-            server.sendmail(from_email, to_email, msg.as_string())
+        # Run the blocking SMTP exchange off the event loop
+        await asyncio.to_thread(_send_message, msg)
 
         return {
             "content": [
@@ -99,11 +189,6 @@ def get_agent_prompt(calendar_events: str = "") -> str:
     if not recipient_email:
         raise ValueError("RECIPIENT_EMAIL environment variable is required")
 
-    now = datetime.now()
-    today = now.strftime("%Y-%m-%d")
-    current_month = now.strftime("%B")  # e.g., "January"
-    next_month = (now.replace(day=28) + timedelta(days=4)).strftime("%B")  # e.g., "February"
-
     calendar_section = f"""
 ## CALENDAR EVENTS (Next 5 Days)
 {calendar_events}
@@ -112,12 +197,29 @@ def get_agent_prompt(calendar_events: str = "") -> str:
 Calendar not configured or no events found.
 """
 
-    return f"""You are a personal assistant helping the user stay on top of their tasks and relationships.
+    header, body = _agent_prompt_parts(date.today().isoformat(), recipient_email)
+    return header + calendar_section + body
+
+
+@lru_cache(maxsize=1)
+def _agent_prompt_parts(today: str, recipient_email: str) -> tuple[str, str]:
+    """
+    Build the date- and recipient-dependent prompt text around the calendar section.
+
+    Cached per day, so a long-running process only rebuilds it when the date changes.
+    """
+    month = date.fromisoformat(today).month
+    current_month = month_name[month]  # e.g., "January"
+    next_month = month_name[month % 12 + 1]  # e.g., "February"
+
+    header = f"""You are a personal assistant helping the user stay on top of their tasks and relationships.
 
 Today's date is: {today}
 Current month: {current_month}
 Next month: {next_month}
-{calendar_section}
+"""
+
+    body = f"""
 
 Your job is to:
 
@@ -144,55 +246,105 @@ Your job is to:
    - Use a clear, professional format with sections and bullet points
    - Subject line should include today's date
 
-Start by searching Notion for the ToDo database, then check Dex CRM, and finally compose and send the email (including the calendar events provided above).
+The Notion and Dex CRM checks are independent of each other: issue their searches together as parallel tool calls rather than finishing one before starting the other, then compose and send the email (including the calendar events provided above).
 
 If you encounter any issues accessing Notion or Dex, include what information you were able to gather and note what couldn't be accessed."""
 
+    return header, body
+
+
+# Email MCP server and agent options, built once and reused across runs
+_EMAIL_SERVER: "McpSdkServerConfig | None" = None
+_AGENT_OPTIONS: "ClaudeAgentOptions | None" = None
+
+
+def _email_server() -> "McpSdkServerConfig":
+    """Return the in-process email MCP server, creating it on first use."""
+    global _EMAIL_SERVER
+
+    if _EMAIL_SERVER is None:
+        from claude_agent_sdk import create_sdk_mcp_server, tool
+
+        _EMAIL_SERVER = create_sdk_mcp_server(
+            name="email", version="1.0.0", tools=[tool(*SEND_EMAIL_TOOL)(send_email)]
+        )
+
+    return _EMAIL_SERVER
+
+
+def _agent_options() -> "ClaudeAgentOptions":
+    """Return the agent options, creating them on first use."""
+    global _AGENT_OPTIONS
+
+    if _AGENT_OPTIONS is None:
+        from claude_agent_sdk import ClaudeAgentOptions
+
+        _AGENT_OPTIONS = ClaudeAgentOptions(
+            system_prompt="You are a helpful personal assistant that checks calendar, tasks and contacts, then sends reminder emails.",
+            mcp_servers={"email": _email_server()},
+            allowed_tools=[
+                "mcp__email__send_email",
+                "mcp__plugin_Notion_notion__notion-search",
+                "mcp__plugin_Notion_notion__notion-fetch",
+                "mcp__dex__search_contacts_full_text",
+                "mcp__dex__get_contact_details",
+                "mcp__dex__get_contact_reminders",
+            ],
+            permission_mode="bypassPermissions",
+            setting_sources=["user", "project", "local"],
+        )
+
+    return _AGENT_OPTIONS
+
 
 async def run_assistant() -> None:
     """Run the personal assistant agent."""
+    from claude_agent_sdk import (
+        ClaudeSDKClient,
+        AssistantMessage,
+        TextBlock,
+        ResultMessage,
+    )
+
     print("Starting ClaudePersonalAssistant...")
     print(f"Current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("-" * 50)
 
-    # Fetch calendar events
+    # Fetch calendar events in a worker thread while the agent client starts up
     print("Fetching calendar events...")
-    calendar_events = get_upcoming_events(days=5)
-    calendar_text = format_events_for_prompt(calendar_events)
-    print(f"Found {len(calendar_events)} calendar events")
-    print("-" * 50)
-
-    email_server = create_sdk_mcp_server(
-        name="email", version="1.0.0", tools=[send_email]
+    calendar_task = asyncio.create_task(
+        asyncio.to_thread(get_upcoming_events_formatted, days=5)
     )
 
-    options = ClaudeAgentOptions(
-        system_prompt="You are a helpful personal assistant that checks calendar, tasks and contacts, then sends reminder emails.",
-        mcp_servers={"email": email_server},
-        allowed_tools=[
-            "mcp__email__send_email",
-            "mcp__plugin_Notion_notion__notion-search",
-            "mcp__plugin_Notion_notion__notion-fetch",
-            "mcp__dex__search_contacts_full_text",
-            "mcp__dex__get_contact_details",
-            "mcp__dex__get_contact_reminders",
-        ],
-        permission_mode="bypassPermissions",
-        setting_sources=["user", "project", "local"],
-    )
-
-    prompt = get_agent_prompt(calendar_events=calendar_text)
+    # Agent text waiting to be written, flushed in chunks instead of per block
+    output: list[str] = []
+    output_len = 0
 
     try:
-        async with ClaudeSDKClient(options=options) as client:
+        async with ClaudeSDKClient(options=_agent_options()) as client:
+            calendar_text, event_count = await calendar_task
+            print(f"Found {event_count} calendar events")
+            print("-" * 50)
+
+            prompt = get_agent_prompt(calendar_events=calendar_text)
             await client.query(prompt)
 
             async for message in client.receive_response():
                 if isinstance(message, AssistantMessage):
                     for block in message.content:
                         if isinstance(block, TextBlock):
-                            print(f"\n{block.text}")
+                            output.append("\n")
+                            output.append(block.text)
+                            output.append("\n")
+                            output_len += len(block.text) + 2
+                    if output_len >= OUTPUT_FLUSH_CHARS:
+                        sys.stdout.write("".join(output))
+                        output.clear()
+                        output_len = 0
                 elif isinstance(message, ResultMessage):
+                    sys.stdout.write("".join(output))
+                    output.clear()
+                    output_len = 0
                     print("\n" + "-" * 50)
                     if message.is_error:
                         print("Agent completed with error")
@@ -201,9 +353,19 @@ async def run_assistant() -> None:
                     print(f"Duration: {message.duration_ms / 1000:.2f}s")
                     if message.total_cost_usd:
                         print(f"Cost: ${message.total_cost_usd:.4f}")
+
+            sys.stdout.write("".join(output))
+            output.clear()
     except Exception as e:
+        sys.stdout.write("".join(output))
         print(f"\nError running assistant: {e}")
         raise
+    finally:
+        # If the client failed to start, cancel the task so its result is not left
+        # unretrieved. The worker thread itself keeps running, and asyncio.run
+        # still waits for the fetch (including a first-run browser sign-in) on exit.
+        if not calendar_task.done():
+            calendar_task.cancel()
 
 
 def main() -> None:
@@ -218,6 +380,13 @@ def main() -> None:
         print("\nPlease copy .env.example to .env and fill in your values.")
         return
 
+    try:
+        get_smtp_config()
+    except SMTPConfigError as e:
+        print(f"Invalid SMTP configuration:\n{e}")
+        print("\nPlease copy .env.example to .env and fill in your values.")
+        return
+
     asyncio.run(run_assistant())
 
 